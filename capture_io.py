@@ -0,0 +1,72 @@
+"""
+Partial reads of arrays stored in .npz capture files.
+
+np.savez stores each array uncompressed, so the .npy member can be seeked
+directly and a slice read without loading the whole (up to 24M sample) array.
+"""
+
+import zipfile
+import numpy as np
+
+
+def _open_npy_member(zf, key):
+    """Opens key.npy inside the archive and returns (file, shape, dtype) positioned at the data"""
+    f = zf.open(key + '.npy')
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+    if fortran_order and len(shape) > 1:
+        raise RuntimeError(f"Fortran ordered array {key} cannot be sliced")
+    if dtype.hasobject:
+        raise RuntimeError(f"Object array {key} cannot be sliced")
+    return f, shape, dtype
+
+
+def npz_array_info(filename, key):
+    """Returns (shape, dtype) of an array in an .npz file without reading its data"""
+    with zipfile.ZipFile(filename) as zf:
+        f, shape, dtype = _open_npy_member(zf, key)
+        f.close()
+    return shape, dtype
+
+
+def read_npz_slice(filename, key, start, stop):
+    """Reads rows [start, stop) of an array in an .npz file"""
+    with zipfile.ZipFile(filename) as zf:
+        f, shape, dtype = _open_npy_member(zf, key)
+        length = shape[0] if len(shape) > 0 else 1
+        start = max(0, min(start, length))
+        stop = max(start, min(stop, length))
+        row_size = dtype.itemsize*int(np.prod(shape[1:]))
+        f.seek(f.tell() + start*row_size)
+        data = f.read((stop - start)*row_size)
+        f.close()
+    return np.frombuffer(data, dtype=dtype).reshape((stop - start,) + tuple(shape[1:]))
+
+
+def capture_xincrement(filename):
+    """Returns the sample spacing of a capture: the saved 'xincrement' if present, else the first time step"""
+    data = np.load(filename)
+    if 'xincrement' in data:
+        return float(data['xincrement'])
+    tdata = read_npz_slice(filename, 'time', 0, 2)
+    return float(tdata[1] - tdata[0])
+
+
+def iter_npz_chunks(filename, key, chunk_size):
+    """Yields (offset, chunk) over an array in an .npz file, holding at most chunk_size rows in memory"""
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be at least 1, not {chunk_size}")
+    with zipfile.ZipFile(filename) as zf:
+        f, shape, dtype = _open_npy_member(zf, key)
+        length = shape[0]
+        row_size = dtype.itemsize*int(np.prod(shape[1:]))
+        offset = 0
+        while offset < length:
+            n = min(chunk_size, length - offset)
+            data = f.read(n*row_size)
+            yield offset, np.frombuffer(data, dtype=dtype).reshape((n,) + tuple(shape[1:]))
+            offset += n
+        f.close()
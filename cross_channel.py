@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Delay, phase and coherence between two channels sampled on the same clock.
+
+Both channels are cut into overlapping windowed segments (Welch's method) and the
+cross-spectrum Sxy = conj(X)*Y is averaged over them, along with the auto spectra
+Sxx and Syy. From those:
+    cross-correlation = irfft(Sxy), peak refined to sub-sample with a parabola
+    phase             = angle(Sxy) per frequency
+    coherence         = |Sxy|^2 / (Sxx*Syy) per frequency
+Segments are zero-padded to twice their length so the correlation is linear, not
+circular. Only one chunk of samples is in memory at a time, so 24M-point captures
+run in bounded memory, and the cost is O(N log nperseg) instead of np.correlate's O(N^2).
+
+Usable delay range: the same window position is compared in both channels, so the
+Hann windowed segments overlap less as the delay grows. The correlation peak falls to
+about 0.4 at nperseg*3/8 and is lost in the noise near nperseg/2, so pick nperseg at
+least 2-3x the largest delay expected.
+
+Sign convention: a positive delay means channel 2 lags channel 1, which shows up as
+a negative phase (ch2 relative to ch1).
+"""
+
+import sys
+import numpy as np
+from capture_io import npz_array_info, iter_npz_chunks, capture_xincrement
+
+
+class CrossSpectrum:
+    """Streaming Welch cross-spectrum accumulator. Feed equal length blocks of x and y to process()."""
+    def __init__(self, nperseg, window=True):
+        self.nperseg = nperseg
+        self.nfft = 2*nperseg
+        self.hop = max(nperseg//2, 1)
+        self.window = np.hanning(nperseg) if window else np.ones(nperseg)
+        self.carry_x = np.zeros(0)
+        self.carry_y = np.zeros(0)
+        self.sxx = np.zeros(self.nfft//2 + 1)
+        self.syy = np.zeros(self.nfft//2 + 1)
+        self.sxy = np.zeros(self.nfft//2 + 1, dtype=complex)
+        self.num_segments = 0
+
+    def _spectra(self, x):
+        segments = np.lib.stride_tricks.sliding_window_view(x, self.nperseg)[::self.hop]
+        segments = segments - segments.mean(axis=1, keepdims=True)    #remove DC per segment
+        return np.fft.rfft(segments*self.window, self.nfft, axis=1)
+
+    def process(self, x_block, y_block):
+        if len(x_block) != len(y_block):
+            raise RuntimeError(f"Channel blocks differ in length ({len(x_block)} != {len(y_block)})")
+        x = np.concatenate((self.carry_x, x_block))
+        y = np.concatenate((self.carry_y, y_block))
+        if len(x) < self.nperseg:
+            self.carry_x, self.carry_y = x, y
+            return
+        k = (len(x) - self.nperseg)//self.hop + 1
+        X = self._spectra(x[:(k-1)*self.hop + self.nperseg])
+        Y = self._spectra(y[:(k-1)*self.hop + self.nperseg])
+        self.sxx += np.sum(X.real**2 + X.imag**2, axis=0)
+        self.syy += np.sum(Y.real**2 + Y.imag**2, axis=0)
+        self.sxy += np.sum(np.conj(X)*Y, axis=0)
+        self.num_segments += k
+        self.carry_x = x[k*self.hop:]
+        self.carry_y = y[k*self.hop:]
+
+    def result(self, fs):
+        """Returns a dict with delay (s and samples), correlation coefficient and per-frequency phase/coherence"""
+        if self.num_segments == 0:
+            raise RuntimeError(f"Not enough samples for one {self.nperseg} sample segment")
+        xcorr = np.fft.irfft(self.sxy, self.nfft)
+        norm = np.sqrt(np.fft.irfft(self.sxx, self.nfft)[0]*np.fft.irfft(self.syy, self.nfft)[0])
+        # Reorder to lags -(nperseg-1)..(nperseg-1)
+        lags_corr = np.concatenate((xcorr[self.nfft - self.nperseg + 1:], xcorr[:self.nperseg]))
+        peak = int(np.argmax(lags_corr))
+        offset = 0.0
+        if 0 < peak < len(lags_corr) - 1:
+            y0, y1, y2 = lags_corr[peak-1:peak+2]
+            denom = y0 - 2*y1 + y2
+            if denom != 0:
+                offset = 0.5*(y0 - y2)/denom
+        delay_samples = peak - (self.nperseg - 1) + offset
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            coherence = np.abs(self.sxy)**2/(self.sxx*self.syy)
+        return {
+            'delay_samples': delay_samples,
+            'delay': delay_samples/fs,
+            'correlation': lags_corr[peak]/norm if norm > 0 else np.nan,
+            'freq': np.fft.rfftfreq(self.nfft, 1/fs),
+            'phase': np.angle(self.sxy),
+            'coherence': np.nan_to_num(coherence),
+            'cross_spectrum': self.sxy/self.num_segments,
+            'num_segments': self.num_segments,
+        }
+
+
+def cross_channel_analysis(x, y, fs, nperseg=65536, chunk_size=1000000):
+    """Runs the analysis on two in-memory arrays, chunk_size samples at a time"""
+    nperseg = min(nperseg, len(x))
+    spectrum = CrossSpectrum(nperseg)
+    for pos in range(0, len(x), chunk_size):
+        spectrum.process(x[pos:pos+chunk_size], y[pos:pos+chunk_size])
+    return spectrum.result(fs)
+
+
+def analyze_file(filename, nperseg=65536, chunk_size=1000000, chan_a=1, chan_b=2):
+    """Runs the analysis on channel_<chan_a> vs channel_<chan_b> of an .npz capture, reading it in chunks"""
+    keys = np.load(filename).files
+    for chan in (chan_a, chan_b):
+        if f'channel_{chan}' not in keys:
+            raise RuntimeError(f"No channel {chan} data in {filename}, the delay analysis needs channels {chan_a} and {chan_b}")
+    shape, dtype = npz_array_info(filename, f'channel_{chan_a}')
+    fs = 1/capture_xincrement(filename)
+    spectrum = CrossSpectrum(min(nperseg, shape[0]))
+    chunks_b = iter_npz_chunks(filename, f'channel_{chan_b}', chunk_size)
+    for (offset, block_a), (offset_b, block_b) in zip(iter_npz_chunks(filename, f'channel_{chan_a}', chunk_size), chunks_b):
+        spectrum.process(block_a, block_b)
+    return spectrum.result(fs)
+
+
+def run(args):
+    try:
+        result = analyze_file(args.filename, args.nperseg, args.chunk_size)
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"Delay (ch2 relative to ch1): {result['delay']:.6g} s ({result['delay_samples']:.3f} samples)")
+    print(f"Peak correlation coefficient: {result['correlation']:.4f} over {result['num_segments']} segments")
+
+    freq = result['freq']
+    if args.freq:
+        freqs = args.freq
+    else:
+        # Report the strongest shared component
+        freqs = [freq[1 + np.argmax(np.abs(result['cross_spectrum'][1:]))]]
+    for f in freqs:
+        i = int(np.argmin(np.abs(freq - f)))
+        print(f"  {freq[i]*1e-3:.3f} kHz: phase {np.degrees(result['phase'][i]):.2f} deg, coherence {result['coherence'][i]:.4f}")
+
+    if args.plot:
+        import matplotlib.pyplot as plt
+        fig, (ax1, ax2) = plt.subplots(2, 1, sharex=True)
+        ax1.plot(freq*1e-3, result['coherence'])
+        ax1.set_ylabel('Coherence')
+        ax1.set_title('Channel 2 vs Channel 1')
+        ax1.grid(True)
+        ax2.plot(freq*1e-3, np.degrees(result['phase']))
+        ax2.set_xlabel('Frequency (kHz)')
+        ax2.set_ylabel('Phase (deg)')
+        ax2.grid(True)
+        plt.show()
+
+
+if __name__ == "__main__":
+    from ds1202_cli import parse_args
+    run(parse_args('delay'))
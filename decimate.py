@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Chunked anti-aliased decimation of captures.
+
+Each stage low-pass filters with a windowed-sinc FIR (cutoff at 0.8x the new Nyquist)
+and keeps every factor-th sample, computed polyphase with scipy.signal.upfirdn so only
+the kept outputs are evaluated. Filter history is carried between blocks, so feeding a
+capture in any block sizes gives the same result as filtering it in one piece. The FIR
+group delay is compensated: output sample k lines up with input sample k*factor.
+
+Large factors are split into a chain of small stages (e.g. 1000 -> 10*10*10), which keeps
+the filters short.
+"""
+
+import numpy as np
+from capture_io import npz_array_info, read_npz_slice, iter_npz_chunks, capture_xincrement
+
+TAPS_PER_FACTOR = 20
+
+
+class Decimator:
+    """Single stage stateful FIR decimator. process() blocks in order, then flush() once."""
+    def __init__(self, factor, numtaps=None):
+        from scipy.signal import firwin
+        self.factor = factor
+        if numtaps is None:
+            numtaps = TAPS_PER_FACTOR*factor + 1
+        if numtaps % 2 == 0:
+            numtaps += 1    #odd length keeps the group delay a whole number of samples
+        self.taps = firwin(numtaps, 0.8/factor, window='hamming') if factor > 1 else np.ones(1)
+        self.delay = (numtaps - 1)//2 if factor > 1 else 0
+        L = len(self.taps)
+        # Start each upfirdn call this many samples early, so its kept outputs land on our grid
+        self.lead = L - 1 + (-(L - 1)) % factor
+        self.buf = None
+        self.buf_start = 0
+        self.next_out = self.delay    #convolution index of the next output sample
+        self.num_in = 0
+
+    def process(self, block):
+        block = np.asarray(block, dtype=float)
+        if len(block) == 0:
+            return np.zeros(0)
+        if self.buf is None:
+            # Pad the history with the first value so the start of the record doesn't droop
+            self.buf = np.full(self.lead, block[0])
+            self.buf_start = -self.lead
+        self.buf = np.concatenate((self.buf, block))
+        self.num_in += len(block)
+        return self._emit()
+
+    def _emit(self):
+        from scipy.signal import upfirdn
+        buf_end = self.buf_start + len(self.buf)
+        if buf_end - 1 < self.next_out:
+            return np.zeros(0)
+        count = (buf_end - 1 - self.next_out)//self.factor + 1
+        seg_start = self.next_out - self.lead
+        last = self.next_out + (count - 1)*self.factor
+        segment = self.buf[seg_start - self.buf_start:last - self.buf_start + 1]
+        first = self.lead//self.factor
+        out = upfirdn(self.taps, segment, down=self.factor)[first:first + count]
+
+        self.next_out += count*self.factor
+        keep_from = self.next_out - self.lead
+        self.buf = self.buf[keep_from - self.buf_start:]
+        self.buf_start = keep_from
+        return out
+
+    def flush(self):
+        """Pads the end with the last value to produce the remaining outputs, ceil(N/factor) in total"""
+        if self.buf is None:
+            return np.zeros(0)
+        total = -(-self.num_in//self.factor)
+        emitted = (self.next_out - self.delay)//self.factor
+        if emitted >= total:
+            return np.zeros(0)
+        self.buf = np.concatenate((self.buf, np.full(self.delay + self.factor, self.buf[-1])))
+        return self._emit()[:total - emitted]
+
+
+def split_factor(factor, max_stage=10):
+    """Splits a decimation factor into stages of at most max_stage where possible, largest first"""
+    stages = []
+    remaining = factor
+    while remaining > 1:
+        for f in range(min(max_stage, remaining), 1, -1):
+            if remaining % f == 0:
+                stages.append(f)
+                remaining //= f
+                break
+        else:
+            stages.append(remaining)    #prime larger than max_stage, one long stage
+            remaining = 1
+    return stages if stages else [1]
+
+
+class DecimationChain:
+    """Cascade of Decimator stages with the same process()/flush() interface"""
+    def __init__(self, factor, max_stage=10):
+        if factor < 1:
+            raise ValueError(f"Decimation factor must be at least 1, not {factor}")
+        self.factor = factor
+        self.stages = [Decimator(f) for f in split_factor(factor, max_stage)]
+
+    def process(self, block):
+        for stage in self.stages:
+            block = stage.process(block)
+        return block
+
+    def flush(self):
+        out = np.zeros(0)
+        for stage in self.stages:
+            out = np.concatenate((stage.process(out), stage.flush())) if len(out) else stage.flush()
+        return out
+
+
+def decimate(x, factor, chunk_size=1000000):
+    """Decimates an in-memory array, chunk_size samples at a time"""
+    chain = DecimationChain(factor)
+    parts = [chain.process(x[pos:pos+chunk_size]) for pos in range(0, len(x), chunk_size)]
+    parts.append(chain.flush())
+    return np.concatenate(parts)
+
+
+def decimate_file(filename, output, factor, chunk_size=1000000):
+    """
+    Writes a decimated copy of an .npz capture: every channel_N decimated, a new time array,
+    'xincrement' set to the new sample spacing and 'decimation_factor' recorded. Other metadata
+    is copied; event indexes are dropped since their sample offsets no longer apply.
+    """
+    data = np.load(filename)
+    t0 = read_npz_slice(filename, 'time', 0, 1)[0]
+    xincrement = capture_xincrement(filename)
+    previous_factor = int(data['decimation_factor']) if 'decimation_factor' in data else 1
+
+    save_data = {}
+    for key in data.keys():
+        if key.startswith('channel_'):
+            chain = DecimationChain(factor)
+            parts = [chain.process(chunk) for offset, chunk in iter_npz_chunks(filename, key, chunk_size)]
+            parts.append(chain.flush())
+            save_data[key] = np.concatenate(parts)
+        elif key != 'time' and not key.startswith('events_ch'):
+            save_data[key] = data[key]
+
+    shape, dtype = npz_array_info(filename, 'time')
+    num_out = -(-shape[0]//factor)
+    save_data['time'] = t0 + np.arange(num_out)*xincrement*factor
+    save_data['xincrement'] = xincrement*factor
+    save_data['decimation_factor'] = previous_factor*factor
+    np.savez(output, **save_data)
+    return save_data
+
+
+def run(args):
+    if args.output:
+        output = args.output if args.output.endswith('.npz') else f"{args.output}.npz"
+    else:
+        output = args.filename[:-4] if args.filename.endswith('.npz') else args.filename
+        output = f"{output}_dec{args.factor}.npz"
+    save_data = decimate_file(args.filename, output, args.factor, args.chunk_size)
+    print(f"Decimated by {args.factor} (stages {'x'.join(str(f) for f in split_factor(args.factor))})")
+    print(f"  Samples: {len(save_data['time'])}, new sample rate {1/save_data['xincrement']:.6g} Sa/s")
+    print(f"  Saved to {output}")
+
+
+if __name__ == "__main__":
+    from ds1202_cli import parse_args
+    run(parse_args('decimate'))
@@ -0,0 +1,2 @@
+@echo off
+python "%~dp0ds1202_cli.py" %*
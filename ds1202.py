@@ -5,20 +5,25 @@ import numpy as np
 
 #TODO: build a ds1202 class
 
-def connect_to_scope(ip):
-    # Create resource manager
-    rm = pyvisa.ResourceManager()
+def connect_to_scope(ip, rm=None):
+    # Create resource manager, unless reusing a long-lived one
+    if rm is None:
+        rm = pyvisa.ResourceManager()
 
     # Connect to oscilloscope
     resource_string = f'TCPIP::{ip}::INSTR'
     print(f"Connecting to {resource_string}...")
 
     scope = rm.open_resource(resource_string)
-    scope.timeout = 5000
-
-    # Test connection with identification query
-    print("Testing connection...")
-    idn = scope.query('*IDN?')
+    try:
+        scope.timeout = 5000
+
+        # Test connection with identification query
+        print("Testing connection...")
+        idn = scope.query('*IDN?')
+    except Exception:
+        scope.close()    #don't leak the session when the scope accepts the connection but doesn't answer
+        raise
     print(f"Connected to: {idn.strip()}")
     return rm, scope
 
@@ -113,8 +118,13 @@ Faster than read_full_ascii. The scope has only 8 bit resolution ADC... jaezuts
 
 The length of the array corresponds to the mem depth with current settings.
 Different settings (channels enabled, etc) may result in different sizes.
+
+If on_block is given, it is called with the volts of each block as it arrives,
+e.g. to decimate or summarize inline while the rest of memory is still being read.
+With keep_data=False the blocks are only passed to on_block, not collected, and
+(None, None) is returned, so memory use doesn't grow with the memory depth.
 """
-def ds_1202_read_full(scope, chan):
+def ds_1202_read_full(scope, chan, on_block=None, keep_data=True):
     if(chan < 1 or chan > 2):
         raise RuntimeError("Source request channel out of range")
     
@@ -172,6 +182,7 @@ def ds_1202_read_full(scope, chan):
     TMC_header_length = 11    #characters. for parsing
     
     scope_data_list = []
+    num_read = 0
     start_pos = 1
     for i, blksize in enumerate(blocksizes):
         print(f"read number: {i+1} of {len(blocksizes)}")
@@ -197,11 +208,17 @@ def ds_1202_read_full(scope, chan):
         
         data_parsed = np.frombuffer(data, dtype=np.uint8)
         data_float = (data_parsed.astype(float) - yorigin - yreference)*yincrement
-        scope_data_list.extend(data_float)
+        if on_block is not None:
+            on_block(data_float)
+        if keep_data:
+            scope_data_list.extend(data_float)
+        num_read += len(data_float)
 
-    scope_data = np.array(scope_data_list)
-    if(len(scope_data) != int(mem_depth)):
+    if(num_read != int(mem_depth)):
         raise RuntimeError("Number of recovered samples does not match memory depth")
+    if not keep_data:
+        return None, None
+    scope_data = np.array(scope_data_list)
     tdata = np.linspace(0,timebase*num_scales, int(mem_depth))    #TODO: replace with mem_depth samples that increment by xincrement. More precise
     # if(tdata[1] - tdata[0] != xincrement):
     #     raise RuntimeWarning(f"You may have fucked up your math: {xincrement} != {tdata[1] - tdata[0]}")
@@ -331,3 +348,235 @@ def ds_1202_decode_binary(binary_dict):
     tdata = np.arange(num_samples) * xincrement
 
     return tdata, volts
+
+
+"""
+Reads one TMC block (#9NNNNNNNNN<data>) from the scope after a :WAVeform:DATA? request
+and returns the payload bytes, stripped of the header and trailing newline.
+"""
+def _read_tmc_block(scope):
+    TMC_header_length = 11    #characters. for parsing
+    scope.write(":WAVeform:DATA?")
+    data = scope.read_raw()
+    TMC_header = data[0:TMC_header_length].decode('ascii')
+    TMC_len = int(TMC_header[2:])
+    data = data[TMC_header_length:TMC_header_length+TMC_len]
+    if(len(data) != TMC_len):
+        raise RuntimeError(f"Reported packet size {TMC_len} mismatches recieved size {len(data)}")
+    return data
+
+
+"""
+Puts the scope into screen-resolution readout: NORMal mode returns the ~1200 points
+currently displayed, BYTE format keeps each transfer to ~1.2kB per channel.
+STARt/STOP are reset too, since a previous RAW read leaves them on its last deep-memory block.
+Only needs to be called once before a loop of ds_1202_read_screen calls, and again
+after any RAW read has changed the waveform mode.
+"""
+def ds_1202_setup_screen(scope):
+    scope.write(":WAVeform:FORMat BYTE")
+    scope.write(":WAVeform:MODE NORMal")
+    scope.write(":WAVeform:STARt 1")
+    scope.write(":WAVeform:STOP 1200")
+
+
+"""
+Returns time (s) and volts of the on-screen waveform for a channel.
+Works while the scope is running, so it is suitable for a live preview loop.
+Uses :WAVeform:PREamble? so the scaling costs a single round trip per read.
+"""
+def ds_1202_read_screen(scope, chan):
+    if(chan < 1 or chan > 2):
+        raise RuntimeError("Source request channel out of range")
+
+    scope.write(":WAVeform:SOURce CHANnel"+str(chan))
+
+    #format,type,points,count,xincrement,xorigin,xreference,yincrement,yorigin,yreference
+    preamble = scope.query(":WAVeform:PREamble?").strip().split(',')
+    xincrement = float(preamble[4])
+    xorigin = float(preamble[5])
+    xreference = float(preamble[6])
+    yincrement = float(preamble[7])
+    yorigin = float(preamble[8])
+    yreference = float(preamble[9])
+
+    data = _read_tmc_block(scope)
+    data_parsed = np.frombuffer(data, dtype=np.uint8)
+    scope_data = (data_parsed.astype(float) - yorigin - yreference)*yincrement
+    tdata = (np.arange(len(scope_data)) - xreference)*xincrement + xorigin
+    return tdata, scope_data
+
+
+"""
+Long-lived, self-healing session to one scope, for acquisition loops that run unattended.
+
+Reads go through call(), e.g. conn.call(ds_1202_read_full, 1). The function gets a proxy
+for the scope session; if it fails with a VISA/network error the session is reopened with
+exponential backoff, the waveform settings written through the proxy are restored, and the
+function is run again from the start. An *IDN? health probe is only sent when the session
+has been idle for longer than probe_interval seconds, so back-to-back captures pay nothing.
+"""
+class ScopeConnection:
+    #settings re-sent after a reconnect, in this order, if they were written through the connection
+    RESTORE_COMMANDS = [":WAVeform:SOURce", ":WAVeform:FORMat", ":WAVeform:MODE", ":WAVeform:STARt", ":WAVeform:STOP"]
+
+    def __init__(self, ip, rm=None, timeout=5000, probe_interval=10.0, initial_backoff=0.5, max_backoff=60.0, max_retries=None,
+                 call_retries=3):
+        self.ip = ip
+        self.rm = rm
+        self.owns_rm = rm is None    #a shared ResourceManager is left open by close()
+        self.timeout = timeout
+        self.probe_interval = probe_interval
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.max_retries = max_retries    #reconnect attempts, None retries forever
+        self.call_retries = call_retries  #times call() re-runs func after a reconnect
+        self.session = None
+        self.state = {}
+        self.last_ok = 0
+        self.reconnects = 0
+        self._proxy = _ScopeProxy(self)
+
+    def _open(self):
+        if self.rm is None:
+            self.rm = pyvisa.ResourceManager()
+        rm, session = connect_to_scope(self.ip, self.rm)    #closes its session itself if *IDN? fails
+        try:
+            session.timeout = self.timeout
+            # STARt/STOP only apply to RAW reads, NORMal mode reads the screen
+            normal_mode = self.state.get(":WAVeform:MODE", "").upper().startswith("NORM")
+            for command in self.RESTORE_COMMANDS:
+                if normal_mode and command in (":WAVeform:STARt", ":WAVeform:STOP"):
+                    continue
+                if command in self.state:
+                    session.write(f"{command} {self.state[command]}")
+        except Exception:
+            session.close()
+            raise
+        self.session = session
+        self.last_ok = time.monotonic()
+
+    def _close_session(self):
+        if self.session is not None:
+            try:
+                self.session.close()
+            except Exception:
+                pass
+            self.session = None
+
+    def _probe(self):
+        """Cheap health check, returns False if the session is dead"""
+        try:
+            self.session.query('*IDN?')
+            self.last_ok = time.monotonic()
+            return True
+        except (pyvisa.errors.VisaIOError, pyvisa.errors.InvalidSession, OSError):
+            return False
+
+    def _reconnect(self):
+        self._close_session()
+        backoff = self.initial_backoff
+        attempt = 0
+        while True:
+            try:
+                was_connected = self.last_ok > 0
+                self._open()
+                if was_connected:
+                    self.reconnects += 1
+                return
+            except (pyvisa.errors.VisaIOError, OSError) as e:
+                attempt += 1
+                if self.max_retries is not None and attempt > self.max_retries:
+                    raise
+                print(f"Reconnect to {self.ip} failed ({e}), retrying in {backoff:.1f}s")
+                time.sleep(backoff)
+                backoff = min(backoff*2, self.max_backoff)
+
+    def ensure_connected(self):
+        if self.session is None:
+            self._reconnect()
+        elif time.monotonic() - self.last_ok > self.probe_interval and not self._probe():
+            print(f"Connection to {self.ip} lost, reconnecting...")
+            self._reconnect()
+
+    def call(self, func, *args, **kwargs):
+        """
+        Runs func(scope, *args, **kwargs). On a VISA/network error the session is probed:
+        if it still answers the error is re-raised, otherwise it reconnects and retries
+        up to call_retries times, backing off between attempts.
+        """
+        attempt = 0
+        backoff = self.initial_backoff
+        while True:
+            self.ensure_connected()
+            try:
+                result = func(self._proxy, *args, **kwargs)
+                self.last_ok = time.monotonic()
+                return result
+            except (pyvisa.errors.VisaIOError, pyvisa.errors.InvalidSession, OSError) as e:
+                if self._probe():
+                    raise    #the scope is fine, the command itself failed
+                attempt += 1
+                if attempt > self.call_retries:
+                    raise
+                print(f"Error talking to {self.ip} ({e}), reconnecting in {backoff:.1f}s...")
+                time.sleep(backoff)
+                backoff = min(backoff*2, self.max_backoff)
+                self._reconnect()
+
+    def write(self, command):
+        return self.call(lambda scope: scope.write(command))
+
+    def query(self, command):
+        return self.call(lambda scope: scope.query(command))
+
+    def close(self):
+        self._close_session()
+        if self.owns_rm and self.rm is not None:
+            self.rm.close()
+            self.rm = None
+
+
+class _ScopeProxy:
+    """Stands in for the pyvisa session inside ScopeConnection.call and records the settings to restore"""
+    def __init__(self, conn):
+        self._conn = conn
+
+    def write(self, command):
+        result = self._conn.session.write(command)
+        header, _, value = command.partition(' ')
+        for restore in ScopeConnection.RESTORE_COMMANDS:
+            if header.upper() == restore.upper():
+                self._conn.state[restore] = value
+        return result
+
+    def query(self, command):
+        return self._conn.session.query(command)
+
+    def read_raw(self):
+        return self._conn.session.read_raw()
+
+    @property
+    def timeout(self):
+        return self._conn.session.timeout
+
+    @timeout.setter
+    def timeout(self, value):
+        self._conn.session.timeout = value
+        self._conn.timeout = value
+
+
+_connections = {}
+_resource_manager = None
+
+"""
+Returns the shared ScopeConnection for ip, creating it on first use.
+All connections share one ResourceManager.
+"""
+def get_connection(ip, **kwargs):
+    global _resource_manager
+    if ip not in _connections:
+        if _resource_manager is None:
+            _resource_manager = pyvisa.ResourceManager()
+        _connections[ip] = ScopeConnection(ip, rm=_resource_manager, **kwargs)
+    return _connections[ip]
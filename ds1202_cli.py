@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Unified `ds1202` command line entry point.
+
+Only argparse is imported at startup. Each subcommand's module (and with it pyvisa,
+matplotlib or scipy) is imported after the arguments are parsed, so the metadata and
+catalog commands never pay for them.
+
+The individual scripts (read_ds1202.py, plot_utils.py, ...) still work and use the
+same argument definitions through parse_args().
+"""
+
+import argparse
+import importlib
+import sys
+
+
+def _non_negative_int(value):
+    """argparse type for counts that may be 0"""
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must not be negative, not {number}")
+    return number
+
+
+def _positive_int(value):
+    """argparse type for counts that must be at least 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, not {number}")
+    return number
+
+
+def _read_arguments(parser):
+    parser.add_argument('ip_address', help='IP address of the oscilloscope')
+    parser.add_argument('--prefix', '-p', default='ds1202_data',
+                        help='Prefix for output filename (default: ds1202_data)')
+    parser.add_argument('--output', '-o',
+                        help='Output filename (overrides --prefix)')
+    parser.add_argument('--channel', '-c', type=int, choices=[1, 2],
+                        help='Oscilloscope channel to read (1 or 2). If not specified, tries both channels.')
+    parser.add_argument('--summary-store', metavar='DIR',
+                        help='Also append per-channel summaries (RMS, Vpp, FFT peaks) to this summary store')
+    parser.add_argument('--decimate', type=_positive_int, metavar='N',
+                        help='Save the capture anti-alias decimated by N, filtered block by block as it is read')
+
+
+def _single_arguments(parser):
+    parser.add_argument('ip_address', help='IP address of the oscilloscope')
+
+
+def _live_arguments(parser):
+    parser.add_argument('ip_address', help='IP address of the oscilloscope')
+    parser.add_argument('--channel', '-c', type=int, choices=[1, 2],
+                        help='Oscilloscope channel to view (1 or 2). If not specified, shows all enabled channels.')
+    parser.add_argument('--prefix', '-p', default='ds1202_data',
+                        help='Prefix for files saved with the r key (default: ds1202_data)')
+    parser.add_argument('--limits-period', type=float, default=1.0,
+                        help='Seconds between re-reading the channel scale/offset for the plot limits (default: 1.0)')
+
+
+def _plot_arguments(parser):
+    parser.add_argument('filename', help='Path to the .npz data file')
+    parser.add_argument('--fft', action='store_true', help="Flag to enable fft. If enabled, a second plot will be generated showing the magnitude spectrum FFT of the data")
+    parser.add_argument('--db', action='store_true', help="Plot FFT magnitude in dB scale (only with --fft)")
+    parser.add_argument('--findpeaks', type=int, metavar='N', help="Find and display N largest peaks per channel (only with --fft)")
+    parser.add_argument('--maxfreq', type=float, metavar='FREQ', help="Upper frequency limit for analysis in Hz (accepts scientific notation, e.g., 1e6 for 1MHz)")
+    parser.add_argument('--event', type=int, metavar='N', help="Only plot event N from the index stored by events.py")
+    parser.add_argument('--event-channel', type=int, choices=[1, 2], help="Channel whose event index to use with --event (default: first indexed channel)")
+
+
+def _metadata_arguments(parser):
+    parser.add_argument('filename', help='Path to the .npz data file')
+
+
+def _catalog_arguments(parser):
+    parser.add_argument('filenames', nargs='+', help='.npz data files')
+
+
+def _label_arguments(parser):
+    parser.add_argument('filename', help='.npz file to add labels to')
+    parser.add_argument('-d', '--description', action='store_true', help='Add description field')
+
+
+def _events_arguments(parser):
+    parser.add_argument('filename', help='.npz file to index')
+    parser.add_argument('--channel', '-c', type=int, choices=[1, 2], default=1, help='Channel to scan (default: 1)')
+    parser.add_argument('--high', type=float, required=True, help='Threshold (V) that starts an event')
+    parser.add_argument('--low', type=float, help='Threshold (V) that ends an event (default: same as --high)')
+    parser.add_argument('--negative', action='store_true', help='Detect negative-going events (start below --low, end above --high)')
+    parser.add_argument('--merge-gap', type=int, default=0, metavar='N', help='Merge events closer than N samples into one burst')
+    parser.add_argument('--min-length', type=int, default=0, metavar='N', help='Drop events shorter than N samples')
+    parser.add_argument('--chunk-size', type=_positive_int, default=1000000, help='Samples scanned per chunk (default: 1000000)')
+
+
+def _mask_arguments(parser):
+    subparsers = parser.add_subparsers(dest='mask_command', required=True)
+
+    build = subparsers.add_parser('build', help='Build a mask from golden captures')
+    build.add_argument('golden', nargs='+', help='Known-good .npz captures')
+    build.add_argument('--output', '-o', required=True, help='Output mask filename')
+    build.add_argument('--channel', '-c', type=int, choices=[1, 2], default=1, help='Channel to build the mask from (default: 1)')
+    build.add_argument('--tol', type=float, required=True, help='Amplitude tolerance around the goldens in volts')
+    build.add_argument('--htol', type=int, default=0, help='Time tolerance in samples (default: 0)')
+    build.add_argument('--align', choices=['trigger', 'xcorr'], default='trigger',
+                       help='trigger: compare sample for sample, xcorr: align by cross-correlation (default: trigger)')
+    build.add_argument('--max-shift', type=_non_negative_int, help='Largest shift in samples searched by xcorr alignment (default: 1%% of the capture length)')
+
+    check = subparsers.add_parser('check', help='Check captures against a mask')
+    check.add_argument('mask', help='Mask file from the build command')
+    check.add_argument('captures', nargs='+', help='.npz captures to check')
+    check.add_argument('--channel', '-c', type=int, choices=[1, 2], default=1, help='Channel to check (default: 1)')
+    check.add_argument('--jobs', '-j', type=_positive_int, help='Worker processes (default: CPU count)')
+    check.add_argument('--show', type=int, default=5, metavar='N', help='Violation ranges printed per failing capture (default: 5)')
+
+
+def _summary_arguments(parser):
+    subparsers = parser.add_subparsers(dest='summary_command', required=True)
+
+    add = subparsers.add_parser('add', help='Append summaries of existing .npz captures (capture time = file modification time)')
+    add.add_argument('store', help='Summary store directory (created if missing)')
+    add.add_argument('filenames', nargs='+', help='.npz captures to summarize')
+    add.add_argument('--peaks', type=int, default=5, help='FFT peaks stored per channel when creating the store (default: 5)')
+
+    query = subparsers.add_parser('query', help='Print a time bucketed rollup of one summary column')
+    query.add_argument('store', help='Summary store directory')
+    query.add_argument('column', help='Column to roll up, e.g. rms, vpp, peak_freq_0')
+    query.add_argument('--bucket', type=float, default=3600, help='Bucket size in seconds (default: 3600)')
+    query.add_argument('--start', help='Start time, epoch seconds or ISO format (default: first row)')
+    query.add_argument('--end', help='End time, epoch seconds or ISO format (default: last row)')
+    query.add_argument('--channel', '-c', type=int, choices=[1, 2], help='Only rows for this channel')
+
+
+def _delay_arguments(parser):
+    parser.add_argument('filename', help='.npz capture with channel_1 and channel_2')
+    parser.add_argument('--freq', type=float, nargs='+', metavar='FREQ',
+                        help='Frequencies in Hz to report phase/coherence at (default: strongest shared component)')
+    parser.add_argument('--nperseg', type=int, default=65536,
+                        help='Segment length in samples; delays up to about half of this can be found (default: 65536)')
+    parser.add_argument('--chunk-size', type=_positive_int, default=1000000, help='Samples read per chunk (default: 1000000)')
+    parser.add_argument('--plot', action='store_true', help='Plot coherence and phase against frequency')
+
+
+def _decimate_arguments(parser):
+    parser.add_argument('filename', help='.npz capture to decimate')
+    parser.add_argument('factor', type=_positive_int, help='Decimation factor')
+    parser.add_argument('--output', '-o', help='Output filename (default: <filename>_dec<factor>.npz)')
+    parser.add_argument('--chunk-size', type=_positive_int, default=1000000, help='Samples filtered per chunk (default: 1000000)')
+
+
+def _export_arguments(parser):
+    parser.add_argument('filename', help='.npz capture to export')
+    parser.add_argument('--format', '-f', choices=['csv', 'wav', 'bin'], default='csv',
+                        help='csv: time and volts columns, wav: 8/16 bit WAV, bin: raw little-endian volts with a JSON header (default: csv)')
+    parser.add_argument('--output', '-o', help='Output filename (default: <filename>.<format>)')
+    parser.add_argument('--chunk-size', type=_positive_int, default=1000000, help='Samples per chunk (default: 1000000)')
+    parser.add_argument('--precision', type=int, default=6, help='Significant digits of CSV volts (default: 6)')
+    parser.add_argument('--no-time', action='store_true', help='Leave the time column out of CSV output')
+    parser.add_argument('--bits', type=int, choices=[8, 16], default=16, help='WAV sample size (default: 16)')
+    parser.add_argument('--full-scale', type=float, metavar='VOLTS', help='Volts mapped to WAV full scale (default: capture peak)')
+    parser.add_argument('--dtype', choices=['f4', 'f8'], default='f4', help='Raw binary sample type (default: f4)')
+
+
+# name: (module providing run(args) and its function, description, argument definitions)
+COMMANDS = {
+    'read': ('read_ds1202', 'run', 'Read full memory depth from the scope and save it to an .npz file', _read_arguments),
+    'single': ('single_trigger', 'run', 'Single trigger the scope and wait for it to stop', _single_arguments),
+    'live': ('live_view', 'run', 'Live preview of the on-screen waveform. Press r for a full RAW capture, q to quit.', _live_arguments),
+    'plot': ('plot_utils', 'run', 'Plot oscilloscope data from an .npz file', _plot_arguments),
+    'metadata': ('view_metadata', 'run', 'Print the metadata stored in an .npz file', _metadata_arguments),
+    'catalog': ('view_metadata', 'run_catalog', 'Print a one line summary per .npz file', _catalog_arguments),
+    'label': ('label_channels', 'run', 'Add labels to channel data in .npz files', _label_arguments),
+    'events': ('events', 'run', 'Find events (pulses/bursts) in a capture and store their index next to the .npz file', _events_arguments),
+    'mask': ('mask_test', 'run', 'Golden waveform mask testing of .npz captures', _mask_arguments),
+    'delay': ('cross_channel', 'run', 'Delay, phase and coherence of channel 2 relative to channel 1', _delay_arguments),
+    'decimate': ('decimate', 'run', 'Anti-alias decimate a capture to a smaller .npz', _decimate_arguments),
+    'export': ('export', 'run', 'Export a capture to CSV, WAV or raw binary in chunks', _export_arguments),
+    'summary': ('summary_store', 'run', 'Per-capture summary metrics store: append and time-range rollups', _summary_arguments),
+}
+
+
+def _dispatch(name, args):
+    module_name, func_name, description, add_arguments = COMMANDS[name]
+    module = importlib.import_module(module_name)
+    return getattr(module, func_name)(args)
+
+
+def parse_args(name, argv=None):
+    """Parses the arguments of one subcommand for a standalone script (used by the individual script entry points)"""
+    module_name, func_name, description, add_arguments = COMMANDS[name]
+    parser = argparse.ArgumentParser(description=description)
+    add_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='ds1202', description='DS1000z series oscilloscope tools')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    for name, (module_name, func_name, description, add_arguments) in COMMANDS.items():
+        add_arguments(subparsers.add_parser(name, help=description, description=description))
+    args = parser.parse_args(argv)
+    return _dispatch(args.command, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
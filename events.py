@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Event segmentation over deep-memory captures.
+
+Events (pulses, bursts) are found with a threshold/hysteresis detector that runs
+vectorized over fixed-size chunks, carrying the detector state between chunks.
+The resulting index of [start, stop) sample offsets is stored next to the capture in
+<capture>.events.npz as events_chN, so plotting/FFT/measurement tools can read just the
+slice for event N. The sidecar keeps indexing from rewriting the (up to 576 MB) capture.
+"""
+
+import sys
+from pathlib import Path
+import numpy as np
+from capture_io import npz_array_info, read_npz_slice, iter_npz_chunks
+
+
+class EventDetector:
+    """
+    Streaming hysteresis detector. An event starts when the signal goes above `high`
+    and stops when it falls below `low`. With polarity='negative' the signal is
+    inverted: events start below `low` and stop above `high`.
+    Feed consecutive blocks to process(); call finish() to get the (N,2) index.
+    """
+    def __init__(self, high, low, polarity='positive'):
+        if high < low:
+            raise ValueError(f"High threshold {high} must not be below low threshold {low}")
+        if polarity not in ('positive', 'negative'):
+            raise ValueError(f"Unknown polarity {polarity}")
+        self.high = high
+        self.low = low
+        self.polarity = polarity
+        self.state = False          #inside an event at the end of the last block
+        self.open_start = None      #start offset of an event still running at the end of the last block
+        self.offset = 0
+        self.starts = []
+        self.stops = []
+
+    def process(self, block):
+        block = np.asarray(block)
+        n = len(block)
+        if n == 0:
+            return
+        if self.polarity == 'positive':
+            mark = np.where(block > self.high, 1, np.where(block < self.low, 0, -1)).astype(np.int8)
+        else:
+            mark = np.where(block < self.low, 1, np.where(block > self.high, 0, -1)).astype(np.int8)
+
+        #forward-fill the in-band (-1) samples with the last decided state, seeded by the carried state
+        idx = np.where(mark >= 0, np.arange(n), -1)
+        np.maximum.accumulate(idx, out=idx)
+        state = np.where(idx >= 0, mark[np.maximum(idx, 0)], int(self.state)).astype(np.int8)
+
+        edges = np.diff(state, prepend=np.int8(self.state))
+        rising = np.flatnonzero(edges == 1) + self.offset
+        falling = np.flatnonzero(edges == -1) + self.offset
+
+        if self.open_start is not None:
+            rising = np.concatenate(([self.open_start], rising))
+        if len(rising) > len(falling):
+            self.open_start = rising[-1]
+            rising = rising[:-1]
+        else:
+            self.open_start = None
+
+        self.starts.append(rising)
+        self.stops.append(falling)
+        self.state = bool(state[-1])
+        self.offset += n
+
+    def finish(self):
+        """Returns the (N,2) int64 array of [start, stop) offsets. An event still open at the end is closed there."""
+        starts = np.concatenate(self.starts) if self.starts else np.zeros(0, dtype=np.int64)
+        stops = np.concatenate(self.stops) if self.stops else np.zeros(0, dtype=np.int64)
+        if self.open_start is not None:
+            starts = np.append(starts, self.open_start)
+            stops = np.append(stops, self.offset)
+        return np.column_stack((starts, stops)).astype(np.int64)
+
+
+def merge_events(events, merge_gap=0, min_length=0):
+    """Merges events separated by fewer than merge_gap samples (pulses -> bursts), then drops events shorter than min_length"""
+    if len(events) == 0:
+        return events
+    if merge_gap > 0:
+        gaps = events[1:, 0] - events[:-1, 1]
+        split = gaps >= merge_gap
+        starts = events[np.concatenate(([True], split)), 0]
+        stops = events[np.concatenate((split, [True])), 1]
+        events = np.column_stack((starts, stops))
+    if min_length > 0:
+        events = events[(events[:, 1] - events[:, 0]) >= min_length]
+    return events
+
+
+def find_events(signal, high, low, polarity='positive', chunk_size=1000000, merge_gap=0, min_length=0):
+    """Returns the (N,2) [start, stop) event index of an in-memory signal"""
+    detector = EventDetector(high, low, polarity)
+    for pos in range(0, len(signal), chunk_size):
+        detector.process(signal[pos:pos+chunk_size])
+    return merge_events(detector.finish(), merge_gap, min_length)
+
+
+def events_filename(filename):
+    """Returns the sidecar path holding the event indexes of a capture: cap.npz -> cap.events.npz"""
+    filename = Path(filename)
+    if filename.suffix == '.npz':
+        return filename.with_name(filename.stem + '.events.npz')
+    return filename.with_name(filename.name + '.events.npz')
+
+
+def index_events(filename, channel, high, low, polarity='positive', chunk_size=1000000, merge_gap=0, min_length=0):
+    """
+    Scans channel_N of an .npz capture in chunks and stores the event index in the
+    events_filename() sidecar as events_chN, along with the detector settings in
+    events_chN_settings. Re-indexing a channel replaces its previous index.
+    """
+    detector = EventDetector(high, low, polarity)
+    for offset, chunk in iter_npz_chunks(filename, f'channel_{channel}', chunk_size):
+        detector.process(chunk)
+    events = merge_events(detector.finish(), merge_gap, min_length)
+
+    # Only the small sidecar is rewritten, the capture itself is never touched
+    sidecar = events_filename(filename)
+    data_dict = dict(np.load(sidecar)) if sidecar.exists() else {}
+    data_dict[f'events_ch{channel}'] = events
+    data_dict[f'events_ch{channel}_settings'] = np.array([high, low, merge_gap, min_length], dtype=float)
+    data_dict[f'events_ch{channel}_polarity'] = polarity
+    np.savez(sidecar, **data_dict)
+    return events
+
+
+def load_events(filename, channel=None):
+    """Returns (channel, events) for the stored index. With channel=None, the first indexed channel is used."""
+    sidecar = events_filename(filename)
+    # Captures indexed before the sidecar existed hold events_chN themselves
+    data = np.load(sidecar if sidecar.exists() else filename)
+    if channel is None:
+        keys = sorted(key for key in data.keys() if key.startswith('events_ch') and key[len('events_ch'):].isdigit())
+        if not keys:
+            raise RuntimeError(f"No event index found in {filename}. Run events.py on it first")
+        channel = int(keys[0][len('events_ch'):])
+    key = f'events_ch{channel}'
+    if key not in data:
+        raise RuntimeError(f"No event index for channel {channel} in {filename}")
+    return channel, data[key]
+
+
+def load_event_data(filename, n, channel=None, pad=0):
+    """
+    Returns a dict with 'time' and every channel_N array sliced to event n (plus pad samples
+    either side), reading only that slice from the file. Usable wherever np.load(filename) is.
+    """
+    channel, events = load_events(filename, channel)
+    if n < 0 or n >= len(events):
+        raise RuntimeError(f"Event {n} out of range, {filename} has {len(events)} events on channel {channel}")
+    start = int(events[n, 0]) - pad
+    stop = int(events[n, 1]) + pad
+
+    data = np.load(filename)
+    event_data = {}
+    for key in data.keys():
+        if key == 'time' or key.startswith('channel_'):
+            event_data[key] = read_npz_slice(filename, key, start, stop)
+    return event_data
+
+
+def run(args):
+    filename = Path(args.filename)
+    if not filename.exists():
+        print(f"Error: File {filename} not found")
+        sys.exit(1)
+
+    low = args.low if args.low is not None else args.high
+    polarity = 'negative' if args.negative else 'positive'
+    shape, dtype = npz_array_info(filename, f'channel_{args.channel}')
+    events = index_events(filename, args.channel, args.high, low, polarity,
+                          chunk_size=args.chunk_size, merge_gap=args.merge_gap, min_length=args.min_length)
+
+    print(f"Found {len(events)} events in {shape[0]} samples of channel {args.channel}")
+    if len(events) > 0:
+        lengths = events[:, 1] - events[:, 0]
+        print(f"  Length (samples): min {lengths.min()}, mean {lengths.mean():.1f}, max {lengths.max()}")
+    print(f"Index saved to {events_filename(filename)} as events_ch{args.channel}")
+
+
+if __name__ == "__main__":
+    from ds1202_cli import parse_args
+    run(parse_args('events'))
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Chunked exporters from .npz captures to CSV, WAV and raw binary.
+
+Every exporter streams the capture in fixed-size chunks (see capture_io), so memory
+stays bounded at 24M samples, and reports throughput in MB/s of output written.
+
+CSV formatting is vectorized: raw captures only hold 256 distinct voltages per channel,
+so each distinct value is formatted once and the column is built with a lookup. Columns
+with too many distinct values (e.g. after decimation) fall back to one %-format call per chunk.
+"""
+
+import json
+import math
+import struct
+import time
+import wave
+import numpy as np
+from capture_io import npz_array_info, read_npz_slice, iter_npz_chunks, capture_xincrement
+from npz_meta import read_metadata
+
+LOOKUP_LIMIT = 65536    #most distinct values in a chunk for lookup table formatting
+
+
+def capture_info(filename):
+    """Returns (channel keys, number of samples, xincrement, t0) of an .npz capture without loading it"""
+    data = np.load(filename)
+    channel_keys = sorted(key for key in data.keys() if key.startswith('channel_'))
+    if not channel_keys:
+        raise RuntimeError(f"No channel data found in {filename}")
+    shape, dtype = npz_array_info(filename, channel_keys[0])
+    t0 = float(read_npz_slice(filename, 'time', 0, 1)[0])
+    return channel_keys, shape[0], capture_xincrement(filename), t0
+
+
+def iter_channel_chunks(filename, channel_keys, chunk_size):
+    """Yields (offset, [chunk per channel]) with all channels read in step"""
+    readers = [iter_npz_chunks(filename, key, chunk_size) for key in channel_keys]
+    for chunks in zip(*readers):
+        yield chunks[0][0], [chunk for offset, chunk in chunks]
+
+
+def _format_column(values, fmt, lookup=True):
+    """Returns a sequence of formatted strings for values"""
+    if lookup:
+        unique, inverse = np.unique(values + 0.0, return_inverse=True)    #+0.0 folds -0 into 0
+        if len(unique) <= LOOKUP_LIMIT and len(unique) < len(values)//4:
+            table = np.array([fmt % v for v in unique.tolist()], dtype=object)
+            return table[inverse.ravel()]
+    return (f'{fmt}\n'*len(values) % tuple(values.tolist())).split('\n')[:-1]
+
+
+def export_csv(filename, output, chunk_size=1000000, precision=6, include_time=True):
+    """Writes time and every channel as CSV columns, returns bytes written"""
+    channel_keys, num_samples, xincrement, t0 = capture_info(filename)
+    fmt = f'%.{precision}g'
+    written = 0
+    with open(output, 'w', newline='') as f:
+        header = ','.join((['time'] if include_time else []) + channel_keys) + '\n'
+        f.write(header)
+        written += len(header)
+        for offset, chunks in iter_channel_chunks(filename, channel_keys, chunk_size):
+            columns = [_format_column(chunk, fmt) for chunk in chunks]
+            if include_time:
+                tdata = t0 + np.arange(offset, offset + len(chunks[0]))*xincrement
+                columns.insert(0, _format_column(tdata, '%.9g', lookup=False))    #every time value is distinct
+            text = '\n'.join(map(','.join, zip(*columns))) + '\n'
+            f.write(text)
+            written += len(text)    #ascii only
+    return written
+
+
+def _peak_volts(filename, channel_keys, chunk_size):
+    peak = 0.0
+    for offset, chunks in iter_channel_chunks(filename, channel_keys, chunk_size):
+        for chunk in chunks:
+            peak = max(peak, float(np.max(np.abs(chunk))))
+    return peak
+
+
+def export_wav(filename, output, bits=16, full_scale=None, chunk_size=1000000):
+    """
+    Writes the channels as a multi-channel WAV at 1/xincrement Hz, returns (bytes written, full scale volts).
+    full_scale is the voltage mapped to digital full scale; by default the capture's peak (one extra read pass).
+    8-bit WAV is unsigned per the WAV spec, 16-bit is signed.
+    """
+    if bits not in (8, 16):
+        raise RuntimeError(f"WAV export supports 8 or 16 bits, not {bits}")
+    channel_keys, num_samples, xincrement, t0 = capture_info(filename)
+    if full_scale is None:
+        full_scale = _peak_volts(filename, channel_keys, chunk_size)
+    if full_scale <= 0:
+        full_scale = 1.0
+    max_code = 127 if bits == 8 else 32767
+
+    written = 0
+    with wave.open(str(output), 'wb') as w:
+        w.setnchannels(len(channel_keys))
+        w.setsampwidth(bits//8)
+        w.setframerate(int(round(1/xincrement)))
+        for offset, chunks in iter_channel_chunks(filename, channel_keys, chunk_size):
+            frames = np.column_stack(chunks)
+            codes = np.clip(np.round(frames*(max_code/full_scale)), -max_code, max_code)
+            if bits == 8:
+                raw = (codes + 128).astype(np.uint8).tobytes()
+            else:
+                raw = codes.astype('<i2').tobytes()
+            w.writeframesraw(raw)
+            written += len(raw)
+    return written, full_scale
+
+
+def _json_safe(value):
+    """Makes a read_metadata value JSON serializable: bytes are decoded and NaN/inf become null"""
+    if isinstance(value, bytes):
+        return value.decode('utf-8', errors='replace')
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, list):
+        return [_json_safe(v) for v in value]
+    return value
+
+
+def export_binary(filename, output, dtype='<f4', chunk_size=1000000):
+    """
+    Writes the channels as interleaved little-endian samples (volts) after a JSON header describing
+    dtype, layout, sample rate and the capture metadata. The file starts with the header length as a
+    little-endian uint32, then the UTF-8 header, space padded so the samples start on a 16 byte boundary.
+    Returns bytes written.
+    """
+    dtype = np.dtype(dtype).newbyteorder('<')
+    channel_keys, num_samples, xincrement, t0 = capture_info(filename)
+    metadata = read_metadata(filename, max_elements=64)
+    header = {
+        'dtype': dtype.str,
+        'layout': 'interleaved',
+        'channels': channel_keys,
+        'num_samples': num_samples,
+        'units': 'V',
+        'xincrement': xincrement,
+        'sample_rate': 1/xincrement,
+        't0': t0,
+        'metadata': {key: _json_safe(value) for key, value in metadata.items()},
+    }
+    # Built before any data is written, so an unserializable header can't leave a half written file
+    header = json.dumps(header, indent=2, allow_nan=False).encode('utf-8')
+    header += b' '*(-(4 + len(header)) % 16)
+
+    with open(output, 'wb') as f:
+        f.write(struct.pack('<I', len(header)) + header)
+        written = 4 + len(header)
+        for offset, chunks in iter_channel_chunks(filename, channel_keys, chunk_size):
+            raw = np.column_stack(chunks).astype(dtype).tobytes()
+            f.write(raw)
+            written += len(raw)
+    return written
+
+
+def run(args):
+    output = args.output
+    if output is None:
+        stem = args.filename[:-4] if args.filename.endswith('.npz') else args.filename
+        output = f"{stem}.{args.format}"
+
+    start = time.perf_counter()
+    if args.format == 'csv':
+        written = export_csv(args.filename, output, args.chunk_size, args.precision, not args.no_time)
+    elif args.format == 'wav':
+        written, full_scale = export_wav(args.filename, output, args.bits, args.full_scale, args.chunk_size)
+        print(f"Full scale = {full_scale:.6g} V")
+    else:
+        written = export_binary(args.filename, output, args.dtype, args.chunk_size)
+    elapsed = time.perf_counter() - start
+
+    print(f"Exported {args.filename} to {output}")
+    print(f"  Wrote {written/1e6:.1f} MB in {elapsed:.2f} s ({written/1e6/max(elapsed, 1e-9):.1f} MB/s)")
+
+
+if __name__ == "__main__":
+    from ds1202_cli import parse_args
+    run(parse_args('export'))
@@ -1,16 +1,9 @@
 import numpy as np
 import sys
-import argparse
 from pathlib import Path
 
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description='Add labels to channel data in .npz files')
-    parser.add_argument('filename', help='.npz file to add labels to')
-    parser.add_argument('-d', '--description', action='store_true', help='Add description field')
-
-    args = parser.parse_args()
-
+def run(args):
     filename = Path(args.filename)
 
     if not filename.exists():
@@ -58,4 +51,9 @@ if __name__ == "__main__":
 
     # Save back to file
     np.savez(filename, **data_dict)
-    print(f"\nLabels saved to {filename}")
\ No newline at end of file
+    print(f"\nLabels saved to {filename}")
+
+
+if __name__ == "__main__":
+    from ds1202_cli import parse_args
+    run(parse_args('label'))
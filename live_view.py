@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+import sys
+import time
+import numpy as np
+import matplotlib.pyplot as plt
+from ds1202 import ScopeConnection, ds_1202_setup_screen, ds_1202_read_screen, ds_1202_read_full
+from read_ds1202 import generate_unique_filename
+
+
+def get_enabled_channels(scope):
+    channels = []
+    for chan in [1, 2]:
+        rply = scope.query(f":CHANnel{chan}:DISPlay?")
+        if(rply.strip() == "1"):
+            channels.append(chan)
+    return channels
+
+
+def get_screen_limits(scope, channels, tdata):
+    """Vertical limits from the channel scale/offset (8 divisions on screen), horizontal from the time array"""
+    ylo = None
+    yhi = None
+    for chan in channels:
+        scale = float(scope.query(f":CHANnel{chan}:SCALe?").strip())
+        offset = float(scope.query(f":CHANnel{chan}:OFFSet?").strip())
+        lo = -4*scale - offset
+        hi = 4*scale - offset
+        ylo = lo if ylo is None else min(ylo, lo)
+        yhi = hi if yhi is None else max(yhi, hi)
+    return (tdata[0], tdata[-1]), (ylo, yhi)
+
+
+def save_raw_capture(scope, channels, ip_address, prefix):
+    """Stop the scope, read full memory depth for each channel and save it the same way read_ds1202.py does"""
+    scope.write(":STOP")
+    try:
+        stat = ""
+        while(stat != "STOP"):
+            time.sleep(0.05)
+            stat = scope.query(":TRIGger:STATus?").strip()
+
+        channels_data = {}
+        for chan in channels:
+            try:
+                tdata_ch, scope_data = ds_1202_read_full(scope, chan)
+                channels_data[f'channel_{chan}'] = scope_data
+            except RuntimeError as e:
+                print(f"Channel {chan}: {e}")
+                continue
+
+        if not channels_data:
+            print("No channels could be read, nothing saved")
+            return
+
+        xincrement = float(scope.query(":WAVeform:XINCrement?").strip())
+        filename = generate_unique_filename(prefix)
+        save_data = {
+            'time': np.arange(len(next(iter(channels_data.values()))))*xincrement,
+            'ip_address': ip_address,
+            'channels_read': list(channels_data.keys()),
+            'xincrement': xincrement
+        }
+        save_data.update(channels_data)
+        np.savez(filename, **save_data)
+        print(f"Saved full capture to {filename}")
+    finally:
+        # Always return to the live view, even if the RAW read failed
+        ds_1202_setup_screen(scope)
+        scope.write(":RUN")
+
+
+def run(args):
+    # Keep-alive session: network blips reconnect and restore the screen readout settings
+    conn = ScopeConnection(args.ip_address)
+    try:
+        conn.ensure_connected()
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.channel is not None:
+        channels = [args.channel]
+    else:
+        channels = conn.call(get_enabled_channels)
+    if not channels:
+        print("Error: No channels enabled.", file=sys.stderr)
+        sys.exit(1)
+
+    conn.call(ds_1202_setup_screen)
+    conn.write(":RUN")
+
+    fig, ax = plt.subplots()
+    ax.set_xlabel('Time (s)')
+    ax.set_ylabel('Voltage (V)')
+    ax.set_title('Live Oscilloscope Data')
+    ax.grid(True)
+
+    lines = {}
+    for chan in channels:
+        tdata, scope_data = conn.call(ds_1202_read_screen, chan)
+        lines[chan] = ax.plot(tdata, scope_data, label=f'Channel {chan}', animated=True)[0]
+    if len(channels) > 1:
+        ax.legend()
+    fps_text = ax.text(0.01, 0.98, '', transform=ax.transAxes, va='top', animated=True)
+
+    state = {'running': True, 'raw_request': False, 'background': None}
+
+    def on_draw(event):
+        # Any full redraw (resize, limit change) invalidates the cached background
+        state['background'] = fig.canvas.copy_from_bbox(ax.bbox)
+
+    def on_key(event):
+        if event.key == 'r':
+            state['raw_request'] = True
+        elif event.key == 'q':
+            state['running'] = False
+
+    def on_close(event):
+        state['running'] = False
+
+    def blit():
+        # Redraw only the animated artists over the cached background
+        if state['background'] is not None:
+            fig.canvas.restore_region(state['background'])
+            for line in lines.values():
+                ax.draw_artist(line)
+            ax.draw_artist(fps_text)
+            fig.canvas.blit(ax.bbox)
+        fig.canvas.flush_events()
+
+    # r is also a default toolbar Home key, which would reset the view on every RAW capture
+    plt.rcParams['keymap.home'] = [key for key in plt.rcParams['keymap.home'] if key != 'r']
+    fig.canvas.mpl_connect('draw_event', on_draw)
+    fig.canvas.mpl_connect('key_press_event', on_key)
+    fig.canvas.mpl_connect('close_event', on_close)
+
+    limits = None
+    limits_time = 0
+    plt.show(block=False)
+    plt.pause(0.1)
+
+    frame_count = 0
+    fps_start = time.perf_counter()
+    try:
+        while state['running']:
+            if state['raw_request']:
+                state['raw_request'] = False
+                fps_text.set_text('Reading full memory...')
+                blit()    #fps_text is animated, so a full draw() would leave it out
+                conn.call(save_raw_capture, channels, args.ip_address, args.prefix)
+                frame_count = 0
+                fps_start = time.perf_counter()
+
+            for chan in channels:
+                tdata, scope_data = conn.call(ds_1202_read_screen, chan)
+                lines[chan].set_data(tdata, scope_data)
+
+            now = time.perf_counter()
+            if now - limits_time > args.limits_period:
+                limits_time = now
+                new_limits = conn.call(get_screen_limits, channels, tdata)
+                if new_limits != limits:
+                    limits = new_limits
+                    ax.set_xlim(*limits[0])
+                    ax.set_ylim(*limits[1])
+                    fig.canvas.draw()    #full redraw only when the axes change
+
+            frame_count += 1
+            elapsed = now - fps_start
+            if elapsed > 0.5:
+                fps_text.set_text(f'{frame_count/elapsed:.1f} FPS')
+                frame_count = 0
+                fps_start = now
+
+            blit()
+
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    from ds1202_cli import parse_args
+    run(parse_args('live'))
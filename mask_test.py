@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Mask (golden waveform) pass/fail testing.
+
+A mask is a tolerance envelope built from one or more known-good captures. New captures
+are aligned to it, either as-is (the scope trigger already aligns memory) or by FFT
+cross-correlation against the golden mean, and every sample outside the envelope is
+reported as a violation range. Batches of files are checked on a process pool.
+"""
+
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+MAX_SHIFT_FRACTION = 0.01    #default xcorr search range, as a fraction of the capture length
+
+
+def _violation_ranges(bad):
+    """Returns (N,2) [start, stop) ranges of True runs in a boolean array"""
+    edges = np.diff(bad.astype(np.int8), prepend=np.int8(0), append=np.int8(0))
+    return np.column_stack((np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+
+class Mask:
+    """
+    Tolerance envelope around a reference waveform.
+    align is 'trigger' (compare sample for sample) or 'xcorr' (shift each capture
+    by the lag that best matches the reference, searched up to max_shift samples,
+    by default MAX_SHIFT_FRACTION of the capture length). Only the samples every
+    allowed shift keeps data for, [max_shift, n - max_shift), decide pass/fail.
+    """
+    def __init__(self, reference, lower, upper, align='trigger', max_shift=None):
+        if align not in ('trigger', 'xcorr'):
+            raise ValueError(f"Unknown alignment {align}")
+        if max_shift is not None and max_shift < 0:
+            raise ValueError(f"max_shift must not be negative, not {max_shift}")
+        self.reference = np.asarray(reference, dtype=float)
+        self.lower = np.asarray(lower, dtype=float)
+        self.upper = np.asarray(upper, dtype=float)
+        self.align = align
+        self.max_shift = max_shift
+        self._ref_fft = None
+        self._nfft = None
+
+    @classmethod
+    def from_golden(cls, goldens, tolerance, h_tolerance=0, align='trigger', max_shift=None):
+        """
+        Builds the envelope as min/max over the goldens (aligned to the first one),
+        widened by h_tolerance samples in time and tolerance volts in amplitude.
+        """
+        goldens = [np.asarray(g, dtype=float) for g in goldens]
+        n = len(goldens[0])
+        for g in goldens:
+            if len(g) != n:
+                raise RuntimeError(f"Golden captures differ in length ({len(g)} != {n})")
+
+        first = cls(goldens[0], goldens[0], goldens[0], align, max_shift)
+        aligned = np.empty((len(goldens), n))
+        aligned[0] = goldens[0]
+        for i, g in enumerate(goldens[1:]):
+            shift = first.find_shift(g)
+            aligned[i+1] = _shift_signal(g, shift)
+
+        lower = np.nanmin(aligned, axis=0)
+        upper = np.nanmax(aligned, axis=0)
+        if h_tolerance > 0:
+            from scipy.ndimage import maximum_filter1d, minimum_filter1d
+            lower = minimum_filter1d(lower, 2*h_tolerance + 1, mode='nearest')
+            upper = maximum_filter1d(upper, 2*h_tolerance + 1, mode='nearest')
+        return cls(np.nanmean(aligned, axis=0), lower - tolerance, upper + tolerance, align, max_shift)
+
+    def search_range(self):
+        """Largest shift find_shift can return, 0 for trigger alignment"""
+        if self.align == 'trigger':
+            return 0
+        n = len(self.reference)
+        max_shift = max(int(n*MAX_SHIFT_FRACTION), 1) if self.max_shift is None else self.max_shift
+        return min(max_shift, n - 1)
+
+    def find_shift(self, signal):
+        """Returns the lag (samples) of signal relative to the reference, 0 for trigger alignment"""
+        if self.align == 'trigger':
+            return 0
+        from scipy import fft as sp_fft    #only xcorr alignment needs scipy
+        n = len(self.reference)
+        if self._ref_fft is None:
+            # Reference spectrum is computed once and reused for every capture checked
+            self._nfft = sp_fft.next_fast_len(2*n, real=True)
+            self._ref_fft = np.conj(sp_fft.rfft(self.reference - self.reference.mean(), self._nfft))
+        sig_fft = sp_fft.rfft(signal - signal.mean(), self._nfft)
+        xcorr = sp_fft.irfft(sig_fft*self._ref_fft, self._nfft)
+        max_shift = self.search_range()
+        lags = np.concatenate((xcorr[:max_shift+1], xcorr[self._nfft-max_shift:]))
+        best = int(np.argmax(lags))
+        return best if best <= max_shift else best - len(lags)
+
+    def check(self, signal):
+        """
+        Aligns signal to the mask and returns a MaskResult. Samples outside the region
+        every allowed shift covers are not compared, so the shift itself never fails a capture.
+        """
+        signal = np.asarray(signal, dtype=float)
+        n = len(self.reference)
+        if len(signal) != n:
+            raise RuntimeError(f"Capture length {len(signal)} does not match mask length {n}")
+        max_shift = self.search_range()
+        if 2*max_shift >= n:
+            raise RuntimeError(f"max_shift {max_shift} leaves no samples to check in a {n} sample mask")
+        shift = self.find_shift(signal)
+        aligned = _shift_signal(signal, shift)
+        unchecked = np.isnan(aligned)
+        bad = np.zeros(n, dtype=bool)
+        checked = slice(max_shift, n - max_shift)
+        bad[checked] = (aligned[checked] > self.upper[checked]) | (aligned[checked] < self.lower[checked])
+        return MaskResult(shift, _violation_ranges(bad), int(np.count_nonzero(bad)), int(np.count_nonzero(unchecked)))
+
+    def save(self, filename):
+        np.savez(filename, mask_reference=self.reference, mask_lower=self.lower, mask_upper=self.upper,
+                 mask_align=self.align, mask_max_shift=-1 if self.max_shift is None else self.max_shift)
+
+    @classmethod
+    def load(cls, filename):
+        data = np.load(filename)
+        max_shift = int(data['mask_max_shift'])
+        return cls(data['mask_reference'], data['mask_lower'], data['mask_upper'],
+                   str(data['mask_align']), None if max_shift < 0 else max_shift)
+
+
+class MaskResult:
+    def __init__(self, shift, violations, num_bad, num_unchecked=0):
+        self.shift = shift                  #samples the capture was shifted by to align it
+        self.violations = violations        #(N,2) [start, stop) sample ranges outside the mask, in mask coordinates
+        self.num_bad = num_bad              #total samples outside the mask
+        self.num_unchecked = num_unchecked  #mask samples with no capture data after the shift, for information only
+
+    @property
+    def passed(self):
+        return self.num_bad == 0
+
+
+def _shift_signal(signal, shift):
+    """Returns signal advanced by shift samples (out[k] = signal[k+shift]), NaN where no data"""
+    out = np.full(len(signal), np.nan)
+    if shift >= 0:
+        out[:len(signal)-shift] = signal[shift:]
+    else:
+        out[-shift:] = signal[:len(signal)+shift]
+    return out
+
+
+_worker_mask = None
+
+
+def _init_worker(mask_file):
+    global _worker_mask
+    _worker_mask = Mask.load(mask_file)
+
+
+def _check_file(args):
+    filename, channel = args
+    data = np.load(filename)
+    result = _worker_mask.check(data[f'channel_{channel}'])
+    return filename, result
+
+
+def check_files(mask_file, filenames, channel, processes=None):
+    """Checks a batch of .npz captures against a saved mask on a process pool. Yields (filename, MaskResult) in order."""
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(mask_file,)) as pool:
+        for filename, result in pool.map(_check_file, [(f, channel) for f in filenames]):
+            yield filename, result
+
+
+def run(args):
+    if args.mask_command == 'build':
+        goldens = [np.load(f)[f'channel_{args.channel}'] for f in args.golden]
+        mask = Mask.from_golden(goldens, args.tol, args.htol, args.align, args.max_shift)
+        filename = args.output if args.output.endswith('.npz') else f"{args.output}.npz"
+        mask.save(filename)
+        print(f"Mask built from {len(goldens)} captures saved to {filename}")
+    else:
+        num_failed = 0
+        for filename, result in check_files(args.mask, args.captures, args.channel, args.jobs):
+            if result.passed:
+                print(f"PASS {filename} (shift {result.shift})")
+                continue
+            num_failed += 1
+            print(f"FAIL {filename} (shift {result.shift}): {result.num_bad} samples in {len(result.violations)} ranges")
+            for start, stop in result.violations[:args.show]:
+                print(f"    samples {start} - {stop-1}")
+        print(f"{len(args.captures) - num_failed} passed, {num_failed} failed")
+        sys.exit(1 if num_failed else 0)
+
+
+if __name__ == "__main__":
+    from ds1202_cli import parse_args
+    run(parse_args('mask'))
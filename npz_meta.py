@@ -0,0 +1,156 @@
+"""
+Stdlib-only reader for the small (metadata) arrays in .npz capture files.
+
+Importing numpy costs more than the whole metadata lookup, and the metadata and
+catalog commands are run from shell loops over thousands of files, so this module
+parses the .npy headers and decodes scalar/string arrays with zipfile and struct.
+Waveform arrays are only described by shape and dtype, never read.
+"""
+
+import re
+import struct
+import zipfile
+
+_HEADER_RE = re.compile(r"'descr':\s*'([^']*)'.*'fortran_order':\s*(True|False).*'shape':\s*\(([^)]*)\)", re.S)
+
+_DESCR_RE = re.compile(r'([<>|=])([a-zA-Z])(\d+)$')
+
+_STRUCT_CODES = {
+    ('f', 8): 'd', ('f', 4): 'f', ('f', 2): 'e',
+    ('i', 8): 'q', ('i', 4): 'i', ('i', 2): 'h', ('i', 1): 'b',
+    ('u', 8): 'Q', ('u', 4): 'I', ('u', 2): 'H', ('u', 1): 'B',
+    ('b', 1): '?',
+}
+
+
+class NpyInfo:
+    def __init__(self, descr, fortran_order, shape):
+        self.descr = descr
+        self.fortran_order = fortran_order
+        self.shape = shape
+        # kind/size are None for descrs that can't be decoded here, e.g. '<M8[D]'
+        match = _DESCR_RE.match(descr)
+        self.order = '>' if match and match.group(1) == '>' else '<'
+        self.kind = match.group(2) if match else None
+        self.size = int(match.group(3)) if match else None
+        if self.kind not in ('U', 'S') and (self.kind, self.size) not in _STRUCT_CODES:
+            self.kind = self.size = None
+
+    @property
+    def struct_code(self):
+        """struct format of one element, or None for strings and unsupported dtypes"""
+        code = _STRUCT_CODES.get((self.kind, self.size))
+        return self.order + code if code else None
+
+    @property
+    def count(self):
+        n = 1
+        for dim in self.shape:
+            n *= dim
+        return n
+
+    @property
+    def itemsize(self):
+        if self.size is None:
+            return None
+        return self.size * (4 if self.kind == 'U' else 1)
+
+
+def _open_npy(zf, key):
+    """Opens key.npy and returns (file, NpyInfo) with the file positioned at the data. info is None for unparseable headers."""
+    f = zf.open(key + '.npy')
+    magic = f.read(8)
+    if magic[:6] != b'\x93NUMPY':
+        raise RuntimeError(f"{key} is not a .npy array")
+    if magic[6] == 1:
+        header_len = struct.unpack('<H', f.read(2))[0]
+    else:
+        header_len = struct.unpack('<I', f.read(4))[0]
+    header = f.read(header_len).decode('latin1')
+    match = _HEADER_RE.search(header)
+    if match is None:
+        return f, None
+    shape = tuple(int(dim) for dim in match.group(3).split(',') if dim.strip())
+    return f, NpyInfo(match.group(1), match.group(2) == 'True', shape)
+
+
+def _reshape(values, shape):
+    if len(shape) == 0:
+        return values[0]
+    if len(shape) == 1:
+        return values
+    step = len(values) // shape[0]
+    return [_reshape(values[i*step:(i+1)*step], shape[1:]) for i in range(shape[0])]
+
+
+def _decode(data, info):
+    """Converts raw array bytes to python values, or returns None for unsupported dtypes"""
+    order, kind, size = info.order, info.kind, info.size
+    if kind is None:
+        return None
+    if kind == 'U':
+        text = data.decode('utf-32-be' if order == '>' else 'utf-32-le')
+        values = [text[i*size:(i+1)*size].rstrip('\x00') for i in range(info.count)]
+    elif kind == 'S':
+        values = [data[i*size:(i+1)*size].rstrip(b'\x00') for i in range(info.count)]
+    else:
+        values = list(struct.unpack(f'{order}{info.count}{_STRUCT_CODES[(kind, size)]}', data))
+    return _reshape(values, info.shape)
+
+
+def _describe(info):
+    if info is None:
+        return '<array with unsupported header>'
+    return f"<array shape={info.shape} dtype={info.descr}>"
+
+
+def read_metadata(filename, max_elements=64, skip_waveforms=True):
+    """
+    Returns {key: value} for the arrays in an .npz file. Arrays of up to max_elements are
+    decoded to python scalars/lists, larger ones are shown as a shape/dtype description.
+    time and channel_N arrays are left out when skip_waveforms is set.
+    """
+    metadata = {}
+    with zipfile.ZipFile(filename) as zf:
+        for name in zf.namelist():
+            if not name.endswith('.npy'):
+                continue
+            key = name[:-4]
+            if skip_waveforms and (key.startswith('channel_') or key.startswith('time')):
+                continue
+            f, info = _open_npy(zf, key)
+            value = None
+            if info is not None and info.kind is not None and info.count <= max_elements and not info.fortran_order:
+                value = _decode(f.read(info.count * info.itemsize), info)
+            f.close()
+            metadata[key] = value if value is not None else _describe(info)
+    return metadata
+
+
+def read_catalog_entry(filename):
+    """
+    Returns a summary dict for one capture: channels, samples, duration (from the first and
+    last time values) and any labels/description, reading only a few bytes of the waveforms.
+    """
+    entry = {'channels': [], 'samples': None, 'duration': None}
+    with zipfile.ZipFile(filename) as zf:
+        keys = [name[:-4] for name in zf.namelist() if name.endswith('.npy')]
+        for key in keys:
+            if key.startswith('channel_'):
+                entry['channels'].append(key)
+        if 'time' in keys:
+            f, info = _open_npy(zf, 'time')
+            code = info.struct_code if info is not None else None
+            if code is not None and len(info.shape) == 1 and info.shape[0] > 0:
+                data_start = f.tell()
+                first = struct.unpack(code, f.read(info.itemsize))[0]
+                f.seek(data_start + (info.shape[0] - 1) * info.itemsize)
+                last = struct.unpack(code, f.read(info.itemsize))[0]
+                entry['samples'] = info.shape[0]
+                entry['duration'] = last - first
+            f.close()
+    metadata = read_metadata(filename, max_elements=1)
+    for key, value in metadata.items():
+        if key.endswith('_label') or key == 'description':
+            entry[key] = value
+    return entry
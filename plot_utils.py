@@ -1,12 +1,16 @@
 import numpy as np
 import matplotlib.pyplot as plt
-import argparse
-import scipy as scipy
-from scipy.signal import find_peaks
+from events import load_event_data
 
-def plot_from_file(filename):
+def load_data(filename, event=None, event_channel=None):
+    """Loads the whole capture, or only the slice for one indexed event (see events.py)"""
+    if event is None:
+        return np.load(filename)
+    return load_event_data(filename, event, event_channel)
+
+def plot_from_file(filename, event=None, event_channel=None):
     """Plot oscilloscope data from numpy .npz file"""
-    data = np.load(filename)
+    data = load_data(filename, event, event_channel)
 
     # Extract time and voltage data
     time = data['time']  # first array (time)
@@ -28,8 +32,13 @@ def plot_from_file(filename):
     ax.grid(True)
     
 
-def plot_fft(filename, db_scale=False, find_peaks_n=None, max_freq=None):
-    data = np.load(filename)
+def plot_fft(filename, db_scale=False, find_peaks_n=None, max_freq=None, event=None, event_channel=None):
+    # scipy is only imported here so plotting without --fft does not pay for it
+    import scipy.fft
+    if find_peaks_n is not None:
+        from scipy.signal import find_peaks
+
+    data = load_data(filename, event, event_channel)
     time = data['time']
 
     # Get sampling parameters
@@ -144,16 +153,13 @@ def plot_fft(filename, db_scale=False, find_peaks_n=None, max_freq=None):
     
     
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description='Plot oscilloscope data from numpy file')
-    parser.add_argument('filename', help='Path to the .npz data file')
-    parser.add_argument('--fft', action='store_true', help="Flag to enable fft. If enabled, a second plot will be generated showing the magnitude spectrum FFT of the data")
-    parser.add_argument('--db', action='store_true', help="Plot FFT magnitude in dB scale (only with --fft)")
-    parser.add_argument('--findpeaks', type=int, metavar='N', help="Find and display N largest peaks per channel (only with --fft)")
-    parser.add_argument('--maxfreq', type=float, metavar='FREQ', help="Upper frequency limit for analysis in Hz (accepts scientific notation, e.g., 1e6 for 1MHz)")
-    
-    args = parser.parse_args()
-    plot_from_file(args.filename)
+def run(args):
+    plot_from_file(args.filename, event=args.event, event_channel=args.event_channel)
     if(args.fft):
-        plot_fft(args.filename, db_scale=args.db, find_peaks_n=args.findpeaks, max_freq=args.maxfreq)
-    plt.show()
\ No newline at end of file
+        plot_fft(args.filename, db_scale=args.db, find_peaks_n=args.findpeaks, max_freq=args.maxfreq, event=args.event, event_channel=args.event_channel)
+    plt.show()
+
+
+if __name__ == "__main__":
+    from ds1202_cli import parse_args
+    run(parse_args('plot'))
\ No newline at end of file
@@ -1,5 +1,4 @@
 #!/usr/bin/env python3
-import argparse
 import numpy as np
 import sys
 from datetime import datetime
@@ -11,36 +10,44 @@ def generate_unique_filename(prefix="ds1202_data"):
     return f"{prefix}_{timestamp}.npz"
 
 
-def main():
-    parser = argparse.ArgumentParser(description='Wrapper script for ds_1202_read_full function')
-    parser.add_argument('ip_address', help='IP address of the oscilloscope')
-    parser.add_argument('--prefix', '-p', default='ds1202_data',
-                        help='Prefix for output filename (default: ds1202_data)')
-    parser.add_argument('--output', '-o',
-                        help='Output filename (overrides --prefix)')
-    parser.add_argument('--channel', '-c', type=int, choices=[1, 2],
-                        help='Oscilloscope channel to read (1 or 2). If not specified, tries both channels.')
-
-    args = parser.parse_args()
-
+def run(args):
     try:
         print(f"Connecting to oscilloscope at {args.ip_address}...")
         rm, scope = connect_to_scope(args.ip_address)
 
         channels_data = {}
+        full_rate_data = {}    #full-rate channels for the summary store, when decimating
         tdata = None
+        full_rate_tdata = None
+
+        def read_channel(channel):
+            nonlocal full_rate_tdata
+            if not args.decimate:
+                return ds_1202_read_full(scope, channel)
+            # Decimate each block inline as it arrives from the scope. The full-rate samples
+            # are only collected if the summary store needs them.
+            from decimate import DecimationChain
+            chain = DecimationChain(args.decimate)
+            parts = []
+            tdata_ch, full_rate = ds_1202_read_full(scope, channel, on_block=lambda block: parts.append(chain.process(block)),
+                                                    keep_data=bool(args.summary_store))
+            parts.append(chain.flush())
+            if full_rate is not None:
+                full_rate_data[f'channel_{channel}'] = full_rate
+                full_rate_tdata = tdata_ch
+            return None, np.concatenate(parts)
 
         if args.channel is not None:
             # Read specific channel
             print(f"Reading data from channel {args.channel}...")
-            tdata, scope_data = ds_1202_read_full(scope, args.channel)
+            tdata, scope_data = read_channel(args.channel)
             channels_data[f'channel_{args.channel}'] = scope_data
         else:
             # Try both channels
             for channel in [1, 2]:
                 try:
                     print(f"Attempting to read data from channel {channel}...")
-                    tdata_ch, scope_data_ch = ds_1202_read_full(scope, channel)
+                    tdata_ch, scope_data_ch = read_channel(channel)
                     channels_data[f'channel_{channel}'] = scope_data_ch
                     if tdata is None:
                         tdata = tdata_ch
@@ -60,18 +67,32 @@ def main():
         print(f"Saving data to {filename}...")
 
         # Prepare data dictionary for saving
+        # Time axis from the scope's sample spacing rather than the linspace approximation
+        xincrement = float(scope.query(":WAVeform:XINCrement?").strip())*(args.decimate or 1)
+        tdata = np.arange(len(next(iter(channels_data.values()))))*xincrement
+
         save_data = {
             'time': tdata,
             'ip_address': args.ip_address,
-            'channels_read': list(channels_data.keys())
+            'channels_read': list(channels_data.keys()),
+            'xincrement': xincrement
         }
         save_data.update(channels_data)
+        if args.decimate:
+            save_data['decimation_factor'] = args.decimate
 
         np.savez(filename, **save_data)
 
+        if args.summary_store:
+            from summary_store import SummaryStore, append_capture
+            if args.decimate:
+                append_capture(SummaryStore(args.summary_store), full_rate_data, full_rate_tdata)
+            else:
+                append_capture(SummaryStore(args.summary_store), channels_data, tdata)
+
         print(f"Data saved successfully!")
         print(f"  Filename: {filename}")
-        print(f"  Time samples: {len(tdata)}")
+        print(f"  Time samples: {len(save_data['time'])}")
         print(f"  Channels saved: {', '.join(channels_data.keys())}")
 
         scope.close()
@@ -83,4 +104,5 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    from ds1202_cli import parse_args
+    run(parse_args('read'))
\ No newline at end of file
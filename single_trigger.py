@@ -1,14 +1,8 @@
-import argparse
 import sys
 from ds1202 import connect_to_scope
 import time
 
-def main():
-    parser = argparse.ArgumentParser(description='Wrapper script for ds_1202_read_full function')
-    parser.add_argument('ip_address', help='IP address of the oscilloscope')
-
-    args = parser.parse_args()
-
+def run(args):
     try:
         print(f"Connecting to oscilloscope at {args.ip_address}...")
         rm, scope = connect_to_scope(args.ip_address)
@@ -31,4 +25,5 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    from ds1202_cli import parse_args
+    run(parse_args('single'))
\ No newline at end of file
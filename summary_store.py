@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Appendable columnar store for small per-capture summaries (RMS, Vpp, FFT peaks...).
+
+Layout on disk:
+    store/schema.json             column names and rows per chunk
+    store/chunk_000000/<col>.f8   one little-endian float64 file per column
+    store/chunk_000001/...
+
+Rows are appended in time order, so every chunk covers a contiguous time range that can
+be read from its first and last timestamp. Time-range queries skip whole chunks and
+binary search the timestamp column inside the rest; rollups bucket the selected rows
+with vectorized reductions. No waveform file is ever opened.
+"""
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+import numpy as np
+
+DTYPE = np.dtype('<f8')
+ITEMSIZE = DTYPE.itemsize
+
+
+def summarize_capture(tdata, volts, n_peaks=5):
+    """
+    Returns the summary row for one channel: mean, rms, vpp and the n_peaks largest
+    spectrum peaks (frequency in Hz and magnitude in volts, as in plot_utils.plot_fft).
+    Missing peaks are NaN so every row has the same columns.
+    """
+    from scipy.signal import find_peaks    #only the acquisition path needs scipy, not queries
+
+    volts = np.asarray(volts, dtype=float)
+    row = {
+        'mean': float(np.mean(volts)),
+        'rms': float(np.sqrt(np.mean(volts*volts))),
+        'vpp': float(np.max(volts) - np.min(volts)),
+    }
+
+    N = len(volts)
+    fs = (N - 1)/(tdata[-1] - tdata[0])
+    mag = np.abs(np.fft.rfft(volts))*2/N
+    freq = np.fft.rfftfreq(N, 1/fs)
+    peaks, properties = find_peaks(mag[1:], height=0)    #skip DC like plot_fft's positive frequency mask
+    peaks = peaks + 1
+    largest = peaks[np.argsort(mag[peaks])[::-1][:n_peaks]]
+    for i in range(n_peaks):
+        row[f'peak_freq_{i}'] = float(freq[largest[i]]) if i < len(largest) else np.nan
+        row[f'peak_mag_{i}'] = float(mag[largest[i]]) if i < len(largest) else np.nan
+    return row
+
+
+def summary_columns(n_peaks=5):
+    """Default column set matching summarize_capture, plus timestamp and channel"""
+    columns = ['timestamp', 'channel', 'mean', 'rms', 'vpp']
+    for i in range(n_peaks):
+        columns.extend([f'peak_freq_{i}', f'peak_mag_{i}'])
+    return columns
+
+
+class SummaryStore:
+    def __init__(self, path, columns=None, chunk_rows=65536):
+        """Opens the store at path, creating it with the given columns if it does not exist"""
+        self.path = Path(path)
+        schema_file = self.path / 'schema.json'
+        if schema_file.exists():
+            with open(schema_file) as f:
+                schema = json.load(f)
+            self.columns = schema['columns']
+            self.chunk_rows = schema['chunk_rows']
+            if columns is not None and list(columns) != self.columns:
+                raise RuntimeError(f"Store {path} has columns {self.columns}, not {list(columns)}")
+        else:
+            if columns is None:
+                columns = summary_columns()
+            if 'timestamp' not in columns:
+                raise RuntimeError("Summary store needs a timestamp column")
+            self.columns = list(columns)
+            self.chunk_rows = chunk_rows
+            self.path.mkdir(parents=True, exist_ok=True)
+            with open(schema_file, 'w') as f:
+                json.dump({'columns': self.columns, 'chunk_rows': self.chunk_rows}, f)
+        self._repair_last_chunk()
+
+    def _chunks(self):
+        return sorted(p for p in self.path.iterdir() if p.is_dir() and p.name.startswith('chunk_'))
+
+    def _chunk_rows(self, chunk):
+        return min((chunk / f'{col}.f8').stat().st_size if (chunk / f'{col}.f8').exists() else 0
+                   for col in self.columns) // ITEMSIZE
+
+    def _repair_last_chunk(self):
+        """Truncates columns of the last chunk to a common length, in case an append was interrupted"""
+        chunks = self._chunks()
+        if not chunks:
+            return
+        rows = self._chunk_rows(chunks[-1])
+        for col in self.columns:
+            filename = chunks[-1] / f'{col}.f8'
+            if filename.exists() and filename.stat().st_size != rows*ITEMSIZE:
+                os.truncate(filename, rows*ITEMSIZE)
+
+    def _read(self, chunk, col, start, stop):
+        return np.fromfile(chunk / f'{col}.f8', dtype=DTYPE, count=stop - start, offset=start*ITEMSIZE)
+
+    def last_timestamp(self):
+        chunks = self._chunks()
+        if not chunks:
+            return None
+        rows = self._chunk_rows(chunks[-1])
+        if rows == 0:
+            return None
+        return float(self._read(chunks[-1], 'timestamp', rows - 1, rows)[0])
+
+    def append(self, rows):
+        """
+        Appends one row (dict of column -> value) or a list of rows. Missing columns are
+        stored as NaN. Timestamps must not go backwards, which keeps chunks time ordered.
+        """
+        if isinstance(rows, dict):
+            rows = [rows]
+        if not rows:
+            return
+        timestamps = np.array([row['timestamp'] for row in rows], dtype=float)
+        last = self.last_timestamp()
+        if np.any(np.diff(timestamps) < 0) or (last is not None and timestamps[0] < last):
+            raise RuntimeError("Summary rows must be appended in timestamp order")
+        table = {col: np.array([row.get(col, np.nan) for row in rows], dtype=DTYPE) for col in self.columns}
+
+        chunks = self._chunks()
+        chunk = chunks[-1] if chunks else None
+        filled = self._chunk_rows(chunk) if chunk is not None else self.chunk_rows
+        pos = 0
+        while pos < len(rows):
+            if filled >= self.chunk_rows:
+                chunk = self.path / f'chunk_{len(chunks):06d}'
+                chunk.mkdir()
+                chunks.append(chunk)
+                filled = 0
+            n = min(self.chunk_rows - filled, len(rows) - pos)
+            for col in self.columns:
+                with open(chunk / f'{col}.f8', 'ab') as f:
+                    table[col][pos:pos+n].tofile(f)
+            filled += n
+            pos += n
+
+    def query(self, start=None, stop=None, columns=None):
+        """Returns {column: array} for rows with start <= timestamp < stop (None for unbounded)"""
+        columns = self.columns if columns is None else list(columns)
+        if 'timestamp' not in columns:
+            columns = ['timestamp'] + columns
+        parts = {col: [] for col in columns}
+        for chunk in self._chunks():
+            rows = self._chunk_rows(chunk)
+            if rows == 0:
+                continue
+            t_first = self._read(chunk, 'timestamp', 0, 1)[0]
+            t_last = self._read(chunk, 'timestamp', rows - 1, rows)[0]
+            if (stop is not None and t_first >= stop) or (start is not None and t_last < start):
+                continue
+            timestamps = np.memmap(chunk / 'timestamp.f8', dtype=DTYPE, mode='r', shape=(rows,))
+            lo = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+            hi = rows if stop is None else int(np.searchsorted(timestamps, stop, side='left'))
+            del timestamps
+            if hi <= lo:
+                continue
+            for col in columns:
+                parts[col].append(self._read(chunk, col, lo, hi))
+        return {col: np.concatenate(parts[col]) if parts[col] else np.zeros(0, dtype=DTYPE) for col in columns}
+
+    def rollup(self, column, bucket, start=None, stop=None, channel=None):
+        """
+        Downsamples a column into fixed time buckets of `bucket` seconds.
+        Returns {bucket_start, count, mean, min, max} arrays for the non-empty buckets; NaN values are ignored.
+        """
+        if channel is not None and 'channel' not in self.columns:
+            raise RuntimeError(f"Store {self.path} has no channel column to select channel {channel} with")
+        columns = [column] if channel is None else [column, 'channel']
+        data = self.query(start, stop, columns)
+        values = data[column]
+        timestamps = data['timestamp']
+        keep = ~np.isnan(values)
+        if channel is not None:
+            keep &= data['channel'] == channel
+        values = values[keep]
+        timestamps = timestamps[keep]
+        if len(values) == 0:
+            empty = np.zeros(0)
+            return {'bucket_start': empty, 'count': empty.astype(np.int64), 'mean': empty, 'min': empty, 'max': empty}
+
+        origin = timestamps[0] if start is None else start
+        bucket_idx = np.floor((timestamps - origin)/bucket).astype(np.int64)
+        # timestamps are sorted, so every bucket is a contiguous run
+        starts = np.flatnonzero(np.diff(bucket_idx, prepend=bucket_idx[0] - 1))
+        counts = np.diff(np.append(starts, len(values)))
+        return {
+            'bucket_start': origin + bucket_idx[starts]*bucket,
+            'count': counts,
+            'mean': np.add.reduceat(values, starts)/counts,
+            'min': np.minimum.reduceat(values, starts),
+            'max': np.maximum.reduceat(values, starts),
+        }
+
+
+def append_capture(store, channels_data, tdata, timestamp=None, n_peaks=5):
+    """
+    Appends one summary row per channel_N in channels_data, as captured by read_ds1202.py.
+    The default timestamp is now, clamped to the store's last timestamp so a backwards clock
+    step (e.g. NTP) doesn't make the append fail.
+    """
+    if timestamp is None:
+        last = store.last_timestamp()
+        timestamp = time.time() if last is None else max(time.time(), last)
+    rows = []
+    for key in sorted(channels_data.keys()):
+        row = summarize_capture(tdata, channels_data[key], n_peaks)
+        row['timestamp'] = timestamp
+        row['channel'] = int(key.split('_')[1])
+        rows.append(row)
+    store.append(rows)
+
+
+def _parse_time(value):
+    """Accepts epoch seconds or an ISO date/time such as 2026-01-31 or 2026-01-31T12:00"""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        from datetime import datetime
+        return datetime.fromisoformat(value).timestamp()
+
+
+def run(args):
+    if args.summary_command == 'add':
+        store = SummaryStore(args.store, summary_columns(args.peaks))
+        # Backfill in capture order, using the file modification time as the capture time
+        files = sorted((Path(f) for f in args.filenames), key=lambda p: p.stat().st_mtime)
+        for filename in files:
+            data = np.load(filename)
+            channels_data = {key: data[key] for key in data.keys() if key.startswith('channel_')}
+            try:
+                append_capture(store, channels_data, data['time'], filename.stat().st_mtime, args.peaks)
+            except RuntimeError:
+                # Rows must stay in time order, so captures older than the last row can't be added
+                print(f"Skipped {filename} (older than store)", file=sys.stderr)
+                continue
+            print(f"Added {filename} ({len(channels_data)} channels)")
+    else:
+        store = SummaryStore(args.store)
+        if args.column not in store.columns:
+            print(f"Error: Column {args.column} not in store. Columns: {', '.join(store.columns)}", file=sys.stderr)
+            sys.exit(1)
+        if args.channel is not None and 'channel' not in store.columns:
+            print(f"Error: Store has no channel column, --channel can't be used", file=sys.stderr)
+            sys.exit(1)
+        result = store.rollup(args.column, args.bucket, _parse_time(args.start), _parse_time(args.end), args.channel)
+        print("bucket_start\tcount\tmean\tmin\tmax")
+        for i in range(len(result['count'])):
+            print(f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(result['bucket_start'][i]))}\t{result['count'][i]}\t"
+                  f"{result['mean'][i]:.6g}\t{result['min'][i]:.6g}\t{result['max'][i]:.6g}")
+
+
+if __name__ == "__main__":
+    from ds1202_cli import parse_args
+    run(parse_args('summary'))
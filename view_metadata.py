@@ -1,29 +1,42 @@
-import numpy as np
 import sys
 from pathlib import Path
-from pprint import pprint
+from npz_meta import read_metadata, read_catalog_entry
 
 
-if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python view_metadata.py <filename.npz>")
-        sys.exit(1)
-
-    filename = Path(sys.argv[1])
+def run(args):
+    from pprint import pprint    #pulls in dataclasses/inspect, not needed by the catalog command
+    filename = Path(args.filename)
 
     if not filename.exists():
         print(f"Error: File {filename} not found")
         sys.exit(1)
 
-    # Load the data
-    data = np.load(filename)
-
-    # Filter out channel_n data entries
-    metadata = {key: data[key] for key in data.keys() if not (key.startswith('channel_') or key.startswith('time'))}
+    # Load the metadata only, channel_n and time entries are skipped without reading them
+    metadata = read_metadata(filename)
 
     if not metadata:
         print("No metadata found in file")
     else:
         print(f"Metadata for {filename.name}:")
         print()
-        pprint(metadata)
\ No newline at end of file
+        pprint(metadata)
+
+
+def run_catalog(args):
+    """One tab separated line per file: name, channels, samples, duration (s), then any labels/description"""
+    for name in args.filenames:
+        filename = Path(name)
+        if not filename.exists():
+            print(f"Error: File {filename} not found", file=sys.stderr)
+            continue
+        entry = read_catalog_entry(filename)
+        duration = entry.pop('duration')
+        fields = [str(filename), ','.join(entry.pop('channels')), str(entry.pop('samples')),
+                  'None' if duration is None else f"{duration:.9g}"]
+        fields.extend(f"{key}={value}" for key, value in sorted(entry.items()))
+        print('\t'.join(fields))
+
+
+if __name__ == "__main__":
+    from ds1202_cli import parse_args
+    run(parse_args('metadata'))